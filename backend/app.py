@@ -21,10 +21,19 @@ DEFAULT_SETTINGS = {
     'download_folder': DEFAULT_DOWNLOAD_FOLDER
 }
 
+# Append-only job journal, kept next to the downloads so it survives container restarts
+JOURNAL_FILE = os.environ.get('JOURNAL_FILE', os.path.join(DEFAULT_DOWNLOAD_FOLDER, '.journal.jsonl'))
+journal_lock = threading.Lock()
+MAX_RESUME_ATTEMPTS = 3  # Give up on jobs restarted this many times in a row without progress (e.g. OOM)
+# Fields a journal record needs before it can be resumed or re-registered
+RESUME_FIELDS = ('url', 'file_id', 'output_dir')
+COMPLETED_FIELDS = ('path', 'name')
+
 # In-memory storage for download progress and control
 progress_data = {}
 download_files = {}
 download_threads = {}
+download_jobs = {}  # Job options (URL, format, output stem...) keyed by download ID
 cancel_flags = {}
 download_history = []  # Session history of completed/cancelled/error downloads
 
@@ -53,6 +62,73 @@ def get_downloads_dir():
 # Create default downloads directory
 os.makedirs(get_downloads_dir(), exist_ok=True)
 
+def journal_append(record):
+    """Append a job record to the journal and flush it to disk.
+
+    The journal is only a recovery aid, so write errors never fail a download.
+    """
+    try:
+        with journal_lock:
+            os.makedirs(os.path.dirname(JOURNAL_FILE) or '.', exist_ok=True)
+            with open(JOURNAL_FILE, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+    except Exception:
+        pass
+
+def load_journal():
+    """Read the journal and merge its records into the latest state of each job."""
+    jobs = {}
+    if not os.path.exists(JOURNAL_FILE):
+        return jobs
+    with open(JOURNAL_FILE, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # Torn last line from a crash mid-write
+                continue
+            job_id = record.get('id')
+            if job_id:
+                jobs.setdefault(job_id, {}).update(record)
+    return jobs
+
+def compact_journal():
+    """Rewrite the journal with one record per job that is still relevant.
+
+    Unfinished jobs are kept, as are completed jobs whose file is still on
+    disk. Partial records (e.g. when the initial append failed) are dropped.
+    Returns the kept jobs keyed by download ID.
+    """
+    with journal_lock:
+        jobs = {}
+        for download_id, job in load_journal().items():
+            state = job.get('state')
+            if state in ['queued', 'downloading']:
+                if all(job.get(field) for field in RESUME_FIELDS):
+                    jobs[download_id] = job
+            elif state == 'completed' and all(job.get(field) for field in COMPLETED_FIELDS):
+                if os.path.exists(job['path']):
+                    jobs[download_id] = job
+        tmp_file = JOURNAL_FILE + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            for job in jobs.values():
+                f.write(json.dumps(job) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, JOURNAL_FILE)
+    return jobs
+
+def remove_job_files(downloads_dir, file_id):
+    """Remove every file (including .part and fragment files) belonging to a job."""
+    for filename in os.listdir(downloads_dir):
+        if filename.startswith(file_id):
+            try:
+                os.remove(os.path.join(downloads_dir, filename))
+            except Exception:
+                pass
+
 def detect_platform(url):
     """Detect the platform from the URL."""
     if 'youtube.com' in url or 'youtu.be' in url:
@@ -113,24 +189,42 @@ def format_bytes(bytes_value):
         return f"{bytes_value / 1024:.2f} KB"
     return f"{bytes_value:.0f} B"
 
+def sweep_downloads():
+    """Remove files older than 30 minutes from downloads directory and compact the journal."""
+    now = time.time()
+    downloads_dir = get_downloads_dir()
+    # Keep the .part/fragment files of jobs that are still running or waiting to resume
+    active_file_ids = tuple(
+        job['file_id'] for download_id, job in list(download_jobs.items())
+        if progress_data.get(download_id, {}).get('status') not in ['completed', 'error', 'cancelled']
+    )
+    for filename in os.listdir(downloads_dir):
+        filepath = os.path.join(downloads_dir, filename)
+        if os.path.abspath(filepath).startswith(os.path.abspath(JOURNAL_FILE)):
+            continue
+        if active_file_ids and filename.startswith(active_file_ids):
+            continue
+        if os.path.isfile(filepath):
+            if now - os.path.getmtime(filepath) > 1800:  # 30 minutes
+                try:
+                    os.remove(filepath)
+                except Exception:
+                    pass
+
+    # Trim finished jobs and expired files from the journal
+    try:
+        compact_journal()
+    except Exception:
+        pass
+
 def cleanup_old_files():
-    """Remove files older than 30 minutes from downloads directory."""
+    """Run the downloads sweep every minute."""
     while True:
         time.sleep(60)  # Check every minute
-        now = time.time()
-        downloads_dir = get_downloads_dir()
-        for filename in os.listdir(downloads_dir):
-            filepath = os.path.join(downloads_dir, filename)
-            if os.path.isfile(filepath):
-                if now - os.path.getmtime(filepath) > 1800:  # 30 minutes
-                    try:
-                        os.remove(filepath)
-                    except Exception:
-                        pass
-
-# Start cleanup thread
-cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
-cleanup_thread.start()
+        try:
+            sweep_downloads()
+        except Exception:
+            pass
 
 @app.route('/api/info', methods=['GET'])
 def get_video_info():
@@ -214,25 +308,17 @@ def get_video_info():
     except Exception as e:
         return jsonify({'error': f'An error occurred: {str(e)}'}), 500
 
-@app.route('/api/download/start', methods=['POST'])
-def start_download():
-    """Start a download and return a download ID for progress tracking."""
-    data = request.get_json()
-    url = data.get('url')
-    format_id = data.get('format', 'best')
-    title = data.get('title', 'Unknown')
-    audio_only = data.get('audio_only', False)
-    thumbnail = data.get('thumbnail', '')
-    quality = data.get('quality', 'best')
+def launch_download(download_id, job):
+    """Register a download job in memory and run it in a background thread."""
+    url = job['url']
+    format_id = job.get('format', 'best')
+    title = job.get('title', 'Unknown')
+    audio_only = job.get('audio_only', False)
+    platform = job.get('platform') or detect_platform(url)
+    file_id = job['file_id']
+    downloads_dir = job['output_dir']
 
-    if not url:
-        return jsonify({'error': 'URL is required'}), 400
-
-    platform = detect_platform(url)
-    if platform == 'unknown':
-        return jsonify({'error': 'Unsupported platform'}), 400
-
-    download_id = str(uuid.uuid4())
+    download_jobs[download_id] = job
 
     # Initialize cancel flag
     cancel_flags[download_id] = False
@@ -249,12 +335,15 @@ def start_download():
         'title': title,
         'platform': platform,
         'audio_only': audio_only,
-        'thumbnail': thumbnail,
+        'thumbnail': job.get('thumbnail', ''),
         'format': format_id,
-        'quality': quality,
+        'quality': job.get('quality', 'best'),
         'error': None
     }
 
+    # Where a resumed job picked up, to tell real progress from a replay of the same spot
+    resume_point = {}
+
     def progress_hook(d):
         # Check if cancelled
         if cancel_flags.get(download_id, False):
@@ -262,6 +351,15 @@ def start_download():
 
         if d['status'] == 'downloading':
             downloaded = d.get('downloaded_bytes', 0)
+
+            # Once a resumed job moves past where it restarted, it is no longer
+            # crash-looping, so normal restarts (deploys) don't count against it
+            if job.get('attempts'):
+                if not resume_point:
+                    resume_point.update(filename=d.get('filename'), downloaded=downloaded or 0)
+                elif d.get('filename') != resume_point['filename'] or (downloaded or 0) > resume_point['downloaded']:
+                    job['attempts'] = 0
+                    journal_append({'id': download_id, 'attempts': 0})
             total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
             speed = d.get('speed', 0)
             eta = d.get('eta', 0)
@@ -294,10 +392,14 @@ def start_download():
             # Check if cancelled before starting
             if cancel_flags.get(download_id, False):
                 progress_data[download_id]['status'] = 'cancelled'
+                journal_append({'id': download_id, 'state': 'cancelled'})
                 return
 
-            downloads_dir = get_downloads_dir()
-            file_id = str(uuid.uuid4())
+            journal_append({'id': download_id, 'state': 'downloading'})
+
+            os.makedirs(downloads_dir, exist_ok=True)
+            # The output stem is fixed per job, so after a restart yt-dlp finds the
+            # job's .part/fragment files and continues them with range requests
             output_template = os.path.join(downloads_dir, f'{file_id}.%(ext)s')
 
             if audio_only:
@@ -337,25 +439,29 @@ def start_download():
                 # Check if cancelled
                 if cancel_flags.get(download_id, False):
                     # Clean up downloaded file
-                    for filename in os.listdir(downloads_dir):
-                        if filename.startswith(file_id):
-                            try:
-                                os.remove(os.path.join(downloads_dir, filename))
-                            except:
-                                pass
+                    remove_job_files(downloads_dir, file_id)
                     progress_data[download_id]['status'] = 'cancelled'
+                    journal_append({'id': download_id, 'state': 'cancelled'})
                     return
 
-                # Find the downloaded file
+                # Use the final path reported by yt-dlp, since resumed jobs can
+                # leave stray .part/.ytdl/.temp files with the same stem
                 downloaded_file = None
-                for filename in os.listdir(downloads_dir):
-                    if filename.startswith(file_id):
-                        downloaded_file = os.path.join(downloads_dir, filename)
-                        break
+                requested = info.get('requested_downloads') or []
+                if requested:
+                    downloaded_file = requested[0].get('filepath')
+                if not downloaded_file:
+                    downloaded_file = info.get('filepath')
+                if not downloaded_file:
+                    for filename in os.listdir(downloads_dir):
+                        if filename.startswith(file_id) and not filename.endswith(('.part', '.ytdl')) and '.temp.' not in filename:
+                            downloaded_file = os.path.join(downloads_dir, filename)
+                            break
 
                 if not downloaded_file or not os.path.exists(downloaded_file):
                     progress_data[download_id]['status'] = 'error'
                     progress_data[download_id]['error'] = 'Download failed'
+                    journal_append({'id': download_id, 'state': 'error'})
                     return
 
                 # Get video title for filename
@@ -373,20 +479,65 @@ def start_download():
                 progress_data[download_id]['status'] = 'completed'
                 progress_data[download_id]['percent'] = 100
                 progress_data[download_id]['filename'] = download_name
+                journal_append({
+                    'id': download_id,
+                    'state': 'completed',
+                    'path': downloaded_file,
+                    'name': download_name
+                })
 
         except Exception as e:
             error_msg = str(e)
             if 'cancelled' in error_msg.lower():
+                # Drop the partial files so they are not resumed later
+                remove_job_files(downloads_dir, file_id)
                 progress_data[download_id]['status'] = 'cancelled'
+                journal_append({'id': download_id, 'state': 'cancelled'})
             else:
                 progress_data[download_id]['status'] = 'error'
                 progress_data[download_id]['error'] = f'Download failed: {error_msg}'
+                journal_append({'id': download_id, 'state': 'error'})
 
     # Start download in background thread
     thread = threading.Thread(target=download_thread, daemon=True)
     download_threads[download_id] = thread
     thread.start()
 
+@app.route('/api/download/start', methods=['POST'])
+def start_download():
+    """Start a download and return a download ID for progress tracking."""
+    data = request.get_json()
+    url = data.get('url')
+    format_id = data.get('format', 'best')
+    title = data.get('title', 'Unknown')
+    audio_only = data.get('audio_only', False)
+    thumbnail = data.get('thumbnail', '')
+    quality = data.get('quality', 'best')
+
+    if not url:
+        return jsonify({'error': 'URL is required'}), 400
+
+    platform = detect_platform(url)
+    if platform == 'unknown':
+        return jsonify({'error': 'Unsupported platform'}), 400
+
+    download_id = str(uuid.uuid4())
+
+    job = {
+        'url': url,
+        'format': format_id,
+        'title': title,
+        'audio_only': audio_only,
+        'thumbnail': thumbnail,
+        'quality': quality,
+        'platform': platform,
+        'file_id': str(uuid.uuid4()),
+        'output_dir': get_downloads_dir()
+    }
+
+    # Record the job before starting it so it can be resumed after a restart
+    journal_append({'id': download_id, 'state': 'queued', **job})
+    launch_download(download_id, job)
     return jsonify({
         'download_id': download_id,
         'title': title,
@@ -406,6 +557,8 @@ def cancel_download(download_id):
     # Update status
     if progress_data[download_id]['status'] not in ['completed', 'error', 'cancelled']:
         progress_data[download_id]['status'] = 'cancelling'
+        # Record it now so a restart before the thread notices won't resume the job
+        journal_append({'id': download_id, 'state': 'cancelled'})
 
     return jsonify({'success': True, 'message': 'Download cancellation requested'})
 
@@ -481,8 +634,10 @@ def clear_completed():
             download_history.insert(0, history_entry)
 
     for download_id in to_remove:
+        journal_append({'id': download_id, 'state': 'cleared'})
         progress_data.pop(download_id, None)
         download_files.pop(download_id, None)
+        download_jobs.pop(download_id, None)
         cancel_flags.pop(download_id, None)
         download_threads.pop(download_id, None)
 
@@ -670,5 +825,112 @@ def health_check():
     """Health check endpoint."""
     return jsonify({'status': 'ok'})
 
+def replay_journal():
+    """Restore jobs recorded in the journal after a restart.
+
+    Interrupted jobs are re-queued with the same output stem so yt-dlp resumes
+    their .part/fragment files, and completed files still on disk are
+    registered again so their download links keep working. Jobs resumed
+    MAX_RESUME_ATTEMPTS times in a row without progress are marked as errors
+    and their files removed.
+    """
+    # Drop finished, cancelled, expired and partial jobs so the journal stays small.
+    # Done before resuming so no state written by the new threads is lost.
+    try:
+        jobs = compact_journal()
+    except Exception:
+        return
+
+    to_resume = []
+    for download_id, job in jobs.items():
+        # A bad record must never stop the server from starting
+        try:
+            if restore_job(download_id, job):
+                to_resume.append(download_id)
+        except Exception:
+            pass
+
+    for download_id in to_resume:
+        try:
+            launch_download(download_id, jobs[download_id])
+        except Exception:
+            pass
+
+def restore_job(download_id, job):
+    """Restore one journal job in memory. Returns True if it must be re-run."""
+    if job['state'] == 'completed':
+        download_files[download_id] = {
+            'path': job['path'],
+            'name': job['name']
+        }
+        cancel_flags[download_id] = False
+        progress_data[download_id] = {
+            'status': 'completed',
+            'downloaded_bytes': 0,
+            'total_bytes': 0,
+            'speed': 0,
+            'eta': 0,
+            'percent': 100,
+            'filename': job['name'],
+            'title': job.get('title', 'Unknown'),
+            'platform': job.get('platform', 'unknown'),
+            'audio_only': job.get('audio_only', False),
+            'thumbnail': job.get('thumbnail', ''),
+            'format': job.get('format', 'best'),
+            'quality': job.get('quality', 'best'),
+            'error': None
+        }
+        return False
+
+    attempts = job.get('attempts', 0) + 1
+    if attempts > MAX_RESUME_ATTEMPTS:
+        try:
+            remove_job_files(job['output_dir'], job['file_id'])
+        except Exception:
+            pass
+        journal_append({'id': download_id, 'state': 'error'})
+        cancel_flags[download_id] = False
+        progress_data[download_id] = {
+            'status': 'error',
+            'downloaded_bytes': 0,
+            'total_bytes': 0,
+            'speed': 0,
+            'eta': 0,
+            'percent': 0,
+            'filename': None,
+            'title': job.get('title', 'Unknown'),
+            'platform': job.get('platform', 'unknown'),
+            'audio_only': job.get('audio_only', False),
+            'thumbnail': job.get('thumbnail', ''),
+            'format': job.get('format', 'best'),
+            'quality': job.get('quality', 'best'),
+            'error': f'Download failed: interrupted by {MAX_RESUME_ATTEMPTS} restarts without progress'
+        }
+        return False
+
+    job['attempts'] = attempts
+    journal_append({'id': download_id, 'attempts': attempts})
+    return True
+
+cleanup_thread = None
+
+def create_app():
+    """Run startup tasks and return the app (used as the gunicorn entry point).
+
+    Kept out of import so that only the serving process resumes jobs and
+    sweeps the downloads folder (not the debug reloader's parent, the flask
+    CLI or tests).
+    """
+    global cleanup_thread
+    if cleanup_thread is None:
+        replay_journal()
+        # Start cleanup thread
+        cleanup_thread = threading.Thread(target=cleanup_old_files, daemon=True)
+        cleanup_thread.start()
+    return app
+
 if __name__ == '__main__':
+    # The debug reloader runs this module twice; only start background work in the serving child
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        create_app()
     app.run(debug=True, port=5000)
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# Keep app.py from touching the real downloads folder and settings on import
+_tmp = tempfile.mkdtemp()
+os.environ.setdefault('DOWNLOAD_FOLDER', os.path.join(_tmp, 'downloads'))
+os.environ.setdefault('SETTINGS_FILE', os.path.join(_tmp, 'settings.json'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
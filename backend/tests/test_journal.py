@@ -0,0 +1,262 @@
+import json
+import os
+import time
+
+import pytest
+
+import app
+
+
+class FakeYoutubeDL:
+    """Stand-in for yt_dlp.YoutubeDL that reports scripted progress and writes a file."""
+
+    progress = []
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=True):
+        for update in self.progress:
+            for hook in self.opts['progress_hooks']:
+                hook(update)
+        filepath = self.opts['outtmpl'].replace('%(ext)s', 'mp4')
+        with open(filepath, 'w') as f:
+            f.write('data')
+        return {'title': 'Video', 'requested_downloads': [{'filepath': filepath}]}
+
+
+def run_job(download_id, job):
+    app.launch_download(download_id, job)
+    app.download_threads[download_id].join(timeout=5)
+
+
+@pytest.fixture
+def journal(tmp_path, monkeypatch):
+    """Point the journal at a temp file and reset the in-memory state."""
+    journal_file = tmp_path / '.journal.jsonl'
+    monkeypatch.setattr(app, 'JOURNAL_FILE', str(journal_file))
+    for store in (app.progress_data, app.download_files, app.download_jobs, app.cancel_flags, app.download_history):
+        store.clear()
+    return journal_file
+
+
+def write_journal(journal_file, records, tail=''):
+    journal_file.write_text(''.join(json.dumps(r) + '\n' for r in records) + tail, encoding='utf-8')
+
+
+def make_job(tmp_path, file_id):
+    return {
+        'url': 'https://youtu.be/x',
+        'format': 'best',
+        'title': 'Video',
+        'audio_only': False,
+        'thumbnail': '',
+        'quality': 'best',
+        'platform': 'youtube',
+        'file_id': file_id,
+        'output_dir': str(tmp_path),
+    }
+
+
+def test_load_journal_merges_records_and_skips_torn_line(journal, tmp_path):
+    write_journal(journal, [
+        {'id': 'a', 'state': 'queued', **make_job(tmp_path, 'fa')},
+        {'id': 'a', 'state': 'downloading'},
+    ], tail='{"id": "b", "sta')
+
+    jobs = app.load_journal()
+
+    assert list(jobs) == ['a']
+    assert jobs['a']['state'] == 'downloading'
+    assert jobs['a']['file_id'] == 'fa'
+
+
+def test_journal_append_ignores_write_errors(monkeypatch, tmp_path):
+    blocker = tmp_path / 'file'
+    blocker.write_text('')
+    monkeypatch.setattr(app, 'JOURNAL_FILE', str(blocker / 'journal.jsonl'))
+
+    app.journal_append({'id': 'a', 'state': 'queued'})
+
+    assert blocker.read_text() == ''
+    assert app.load_journal() == {}
+
+
+def test_compact_journal_keeps_unfinished_and_existing_completed(journal, tmp_path):
+    done = tmp_path / 'fdone.mp4'
+    done.write_text('data')
+    write_journal(journal, [
+        {'id': 'running', 'state': 'queued', **make_job(tmp_path, 'frun')},
+        {'id': 'running', 'state': 'downloading'},
+        {'id': 'done', 'state': 'completed', 'path': str(done), 'name': 'Video.mp4'},
+        {'id': 'expired', 'state': 'completed', 'path': str(tmp_path / 'gone.mp4'), 'name': 'Gone.mp4'},
+        {'id': 'cancelled', 'state': 'cancelled'},
+        {'id': 'cleared', 'state': 'completed', 'path': str(done), 'name': 'Video.mp4'},
+        {'id': 'cleared', 'state': 'cleared'},
+    ])
+
+    jobs = app.compact_journal()
+
+    assert set(jobs) == {'running', 'done'}
+    lines = journal.read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 2
+    assert app.load_journal() == jobs
+
+
+def test_replay_journal_resumes_and_restores(journal, tmp_path, monkeypatch):
+    done = tmp_path / 'fdone.mp4'
+    done.write_text('data')
+    write_journal(journal, [
+        {'id': 'running', 'state': 'downloading', **make_job(tmp_path, 'frun')},
+        {'id': 'done', 'state': 'completed', 'title': 'Video', 'path': str(done), 'name': 'Video.mp4'},
+    ])
+    launched = []
+    monkeypatch.setattr(app, 'launch_download', lambda download_id, job: launched.append((download_id, job)))
+
+    app.replay_journal()
+
+    assert [download_id for download_id, _ in launched] == ['running']
+    assert launched[0][1]['file_id'] == 'frun'
+    assert app.load_journal()['running']['attempts'] == 1
+    assert app.download_files['done'] == {'path': str(done), 'name': 'Video.mp4'}
+    assert app.progress_data['done']['status'] == 'completed'
+
+
+def test_replay_journal_gives_up_after_max_attempts(journal, tmp_path, monkeypatch):
+    partial = tmp_path / 'fdead.mp4.part'
+    partial.write_text('data')
+    write_journal(journal, [
+        {'id': 'dead', 'state': 'downloading', 'attempts': app.MAX_RESUME_ATTEMPTS, **make_job(tmp_path, 'fdead')},
+    ])
+    launched = []
+    monkeypatch.setattr(app, 'launch_download', lambda download_id, job: launched.append(download_id))
+
+    app.replay_journal()
+
+    assert launched == []
+    assert not partial.exists()
+    assert app.load_journal()['dead']['state'] == 'error'
+    assert app.progress_data['dead']['status'] == 'error'
+    assert app.progress_data['dead']['error']
+
+
+def test_remove_job_files_only_removes_job_stem(tmp_path):
+    for name in ['fjob.mp4.part', 'fjob.f137.mp4', 'fjob.mp4.ytdl', 'other.mp4']:
+        (tmp_path / name).write_text('data')
+
+    app.remove_job_files(str(tmp_path), 'fjob')
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['other.mp4']
+
+
+def test_replay_journal_drops_partial_records(journal, tmp_path, monkeypatch):
+    write_journal(journal, [
+        {'id': 'x', 'state': 'downloading'},
+        {'id': 'y', 'state': 'completed'},
+        {'id': 'ok', 'state': 'queued', **make_job(tmp_path, 'fok')},
+    ])
+    launched = []
+    monkeypatch.setattr(app, 'launch_download', lambda download_id, job: launched.append(download_id))
+
+    app.replay_journal()
+
+    assert launched == ['ok']
+    assert set(app.load_journal()) == {'ok'}
+    assert 'y' not in app.download_files
+
+
+def test_replay_journal_survives_launch_errors(journal, tmp_path, monkeypatch):
+    write_journal(journal, [
+        {'id': 'a', 'state': 'queued', **make_job(tmp_path, 'fa')},
+        {'id': 'b', 'state': 'queued', **make_job(tmp_path, 'fb')},
+    ])
+    launched = []
+
+    def fake_launch(download_id, job):
+        if download_id == 'a':
+            raise KeyError('format')
+        launched.append(download_id)
+
+    monkeypatch.setattr(app, 'launch_download', fake_launch)
+
+    app.replay_journal()
+
+    assert launched == ['b']
+
+
+def test_resumed_job_resets_attempts_after_progress(journal, tmp_path, monkeypatch):
+    monkeypatch.setattr(app.yt_dlp, 'YoutubeDL', FakeYoutubeDL)
+    monkeypatch.setattr(FakeYoutubeDL, 'progress', [
+        {'status': 'downloading', 'filename': 'f', 'downloaded_bytes': 100},
+        {'status': 'downloading', 'filename': 'f', 'downloaded_bytes': 200},
+    ])
+    job = {**make_job(tmp_path, 'fjob'), 'attempts': 2}
+
+    run_job('job', job)
+
+    journaled = app.load_journal()['job']
+    assert journaled['attempts'] == 0
+    assert journaled['state'] == 'completed'
+    assert journaled['path'] == str(tmp_path / 'fjob.mp4')
+
+
+def test_resumed_job_keeps_attempts_without_progress(journal, tmp_path, monkeypatch):
+    monkeypatch.setattr(app.yt_dlp, 'YoutubeDL', FakeYoutubeDL)
+    monkeypatch.setattr(FakeYoutubeDL, 'progress', [
+        {'status': 'downloading', 'filename': 'f', 'downloaded_bytes': 100},
+    ])
+    job = {**make_job(tmp_path, 'fjob'), 'attempts': 2}
+
+    run_job('job', job)
+
+    assert 'attempts' not in app.load_journal()['job']
+
+
+def test_sweep_keeps_files_of_active_jobs(journal, tmp_path, monkeypatch):
+    monkeypatch.setattr(app, 'get_downloads_dir', lambda: str(tmp_path))
+    app.download_jobs['active'] = make_job(tmp_path, 'factive')
+    app.progress_data['active'] = {'status': 'starting'}
+    app.download_jobs['done'] = make_job(tmp_path, 'fdone')
+    app.progress_data['done'] = {'status': 'completed'}
+    app.journal_append({'id': 'active', 'state': 'downloading', **app.download_jobs['active']})
+    stale = time.time() - 3600
+    for name in ['factive.mp4.part', 'factive.f137.mp4', 'fdone.mp4', 'orphan.mp4.part']:
+        path = tmp_path / name
+        path.write_text('data')
+        os.utime(path, (stale, stale))
+
+    app.sweep_downloads()
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['.journal.jsonl', 'factive.f137.mp4', 'factive.mp4.part']
+    assert set(app.load_journal()) == {'active'}
+
+
+def test_cancel_endpoint_journals_cancellation(journal, tmp_path):
+    app.progress_data['job'] = {'status': 'processing'}
+    app.journal_append({'id': 'job', 'state': 'downloading', **make_job(tmp_path, 'fjob')})
+
+    response = app.app.test_client().post('/api/download/cancel/job')
+
+    assert response.status_code == 200
+    assert app.progress_data['job']['status'] == 'cancelling'
+    assert app.load_journal()['job']['state'] == 'cancelled'
+
+
+def test_clear_endpoint_journals_cleared_jobs(journal, tmp_path):
+    app.progress_data['done'] = {'status': 'completed', 'title': 'Video'}
+    app.progress_data['running'] = {'status': 'downloading', 'title': 'Video'}
+    app.journal_append({'id': 'done', 'state': 'completed', 'path': str(tmp_path / 'f.mp4'), 'name': 'Video.mp4'})
+    app.journal_append({'id': 'running', 'state': 'downloading', **make_job(tmp_path, 'frun')})
+
+    response = app.app.test_client().post('/api/download/clear')
+
+    assert response.get_json() == {'cleared': 1}
+    jobs = app.load_journal()
+    assert jobs['done']['state'] == 'cleared'
+    assert jobs['running']['state'] == 'downloading'